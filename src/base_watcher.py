@@ -4,6 +4,9 @@ import logging
 from pathlib import Path
 from abc import ABC, abstractmethod
 
+# Upper bound for the retry delay after repeated failures (seconds)
+MAX_BACKOFF = 3600
+
 
 class BaseWatcher(ABC):
     def __init__(self, vault_path: str, check_interval: int = 60):
@@ -12,6 +15,7 @@ class BaseWatcher(ABC):
         self.inbox = self.vault_path / 'Inbox'
         self.check_interval = check_interval
         self.logger = logging.getLogger(self.__class__.__name__)
+        self._backoff = check_interval
         
     @abstractmethod
     def check_for_updates(self) -> list:
@@ -22,14 +26,29 @@ class BaseWatcher(ABC):
     def create_action_file(self, item) -> Path:
         '''Create .md file in appropriate folder (Inbox for raw emails, Needs_Action for action items)'''
         pass
+
+    def create_action_files(self, items: list) -> list:
+        '''Create action files for all items; override to process them concurrently'''
+        return [self.create_action_file(item) for item in items]
+
+    def _run_cycle(self):
+        '''Check for updates once and create action files for the new items'''
+        self.create_action_files(self.check_for_updates())
     
     def run(self):
         self.logger.info(f'Starting {self.__class__.__name__}')
+        # Schedule ticks on the monotonic clock so slow cycles don't stretch the interval
+        next_tick = time.monotonic()
         while True:
             try:
-                items = self.check_for_updates()
-                for item in items:
-                    self.create_action_file(item)
+                self._run_cycle()
+                self._backoff = self.check_interval
+                next_tick += self.check_interval
             except Exception as e:
                 self.logger.error(f'Error: {e}')
-            time.sleep(self.check_interval)
+                # Back off exponentially on repeated failures to avoid rapid error loops
+                self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+                next_tick = time.monotonic() + self._backoff
+            # If a cycle overran its slot, start the next one now rather than queueing up
+            time.sleep(max(0, next_tick - time.monotonic()))
+            next_tick = max(next_tick, time.monotonic())
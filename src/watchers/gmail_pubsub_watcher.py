@@ -0,0 +1,103 @@
+# gmail_pubsub_watcher.py
+import os
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+
+# Add the parent directory to the path to import the watchers package
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from watchers.gmail_watcher import GmailWatcher
+
+# Import Google Cloud Pub/Sub library with error handling
+try:
+    from google.cloud import pubsub_v1
+except ImportError as e:
+    print(f"Google Cloud Pub/Sub library not installed. Please install: pip install '.[pubsub]'")
+    raise e
+
+# Gmail expires watch registrations after 7 days, so renew a day early
+WATCH_RENEWAL_INTERVAL = 6 * 24 * 60 * 60
+
+
+class GmailPubSubWatcher(GmailWatcher):
+    """Gmail watcher driven by Pub/Sub push notifications, with polling as a backstop"""
+
+    def __init__(self, vault_path: str, credentials_path: str, topic_name: str,
+                 subscription_path: str, check_interval: int = 300):
+        super().__init__(vault_path, credentials_path, check_interval)
+        self.topic_name = topic_name
+        self.subscription_path = subscription_path
+        self.subscriber = pubsub_v1.SubscriberClient()
+        self.watch_renewed_at = None
+
+        # Notifications arrive on subscriber threads; serialize every Gmail API call
+        self._sync_lock = threading.Lock()
+
+    def _register_watch(self):
+        """Ask Gmail to publish INBOX changes to the configured Pub/Sub topic"""
+        response = self.service.users().watch(
+            userId='me',
+            body={'labelIds': ['INBOX'], 'topicName': self.topic_name}
+        ).execute()
+        self.watch_renewed_at = time.monotonic()
+        self.logger.info(f"Registered Gmail watch on {self.topic_name} (expires {response.get('expiration')})")
+
+    def _sync(self):
+        """Fetch the mailbox delta and create action files for new emails"""
+        with self._sync_lock:
+            super()._run_cycle()
+
+    def _run_cycle(self):
+        """Renew the Gmail watch when due, then run a backstop sync for dropped notifications"""
+        # The service's HTTP client is shared with the notification threads, so hold the lock
+        with self._sync_lock:
+            if time.monotonic() - self.watch_renewed_at >= WATCH_RENEWAL_INTERVAL:
+                self._register_watch()
+        self._sync()
+
+    def _on_push(self, message):
+        """Handle a Gmail notification delivered through Pub/Sub"""
+        try:
+            data = json.loads(message.data.decode('utf-8'))
+            history_id = data.get('historyId')
+
+            # Skip notifications for changes we have already synced past
+            if history_id and self.history_id and int(history_id) <= int(self.history_id):
+                return
+
+            self._sync()
+        except Exception as e:
+            self.logger.error(f"Error handling Pub/Sub notification: {e}")
+        finally:
+            message.ack()
+
+    def run(self):
+        """Stream notifications from Pub/Sub and poll at a slow interval for dropped ones"""
+        self._register_watch()
+        self._streaming_pull = self.subscriber.subscribe(self.subscription_path, callback=self._on_push)
+        super().run()
+
+    def _shutdown(self):
+        """Stop receiving notifications before the worker pool is shut down"""
+        self._streaming_pull.cancel()
+        self.subscriber.close()
+        super()._shutdown()
+
+
+if __name__ == "__main__":
+    # Example usage - adjust paths as needed
+    # When running from project root: python -m src.watchers.gmail_pubsub_watcher
+    VAULT_PATH = "./AI_Employee_Vault"  # Use the dedicated vault directory
+    CREDENTIALS_PATH = "token.json"  # Path to Gmail API authorized user credentials
+    TOPIC_NAME = os.getenv('GMAIL_PUBSUB_TOPIC')  # e.g. projects/<project>/topics/<topic>
+    SUBSCRIPTION_PATH = os.getenv('GMAIL_PUBSUB_SUBSCRIPTION')  # e.g. projects/<project>/subscriptions/<sub>
+
+    try:
+        watcher = GmailPubSubWatcher(VAULT_PATH, CREDENTIALS_PATH, TOPIC_NAME, SUBSCRIPTION_PATH)
+        watcher.run()
+    except Exception as e:
+        print(f"Failed to start Gmail Pub/Sub Watcher: {e}")
+        print("Make sure GMAIL_PUBSUB_TOPIC and GMAIL_PUBSUB_SUBSCRIPTION are set and token.json is valid")
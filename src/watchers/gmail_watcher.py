@@ -1,8 +1,12 @@
 # gmail_watcher.py
+import os
 import sys
 from pathlib import Path
-import time
 import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import base64
 import re
@@ -17,11 +21,144 @@ from base_watcher import BaseWatcher
 try:
     from google.oauth2.credentials import Credentials
     from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+    from googleapiclient.model import JsonModel
     from google.auth.exceptions import RefreshError
 except ImportError as e:
     print(f"Google API libraries not installed. Please install: pip install google-api-python-client google-auth")
     raise e
 
+# selectolax is optional (pip install '.[fast]'); without it HTML is stripped with the regex fallback
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+# orjson is optional (pip install '.[fast]'); without it API responses are decoded with the stdlib json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pyahocorasick is optional (pip install '.[fast]'); without it priority keywords are matched with a regex
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Keywords that mark an email as high priority when found in its subject, sender or body
+HIGH_PRIORITY_KEYWORDS = (
+    'urgent', 'asap', 'important', 'deadline', 'invoice',
+    'payment', 'money', 'billing', 'due', 'critical'
+)
+
+# Regexes used on every email, compiled once at import time
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)[^>]*>.*?</\1>', re.DOTALL | re.IGNORECASE)
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]*>')
+_WS_RE = re.compile(r'\s+')
+_LINE_BREAK_RE = re.compile(r'[ \t]*\n[ \t]*')
+_HTML_REMNANTS_RE = re.compile(r'^[<>\s\/=\-"\'\[\]]*$')
+_URL_RE = re.compile(r'(?:http[s]?://|www\.)(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+# Maps ASCII whitespace control bytes to spaces; safe on UTF-8 and other
+# ASCII-compatible charsets since these bytes never occur inside multi-byte sequences
+_WS_TABLE = bytes.maketrans(b'\t\n\r\x0b\x0c', b'     ')
+_CHARSET_RE = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+# Plain substring alternation (no word boundaries) so 'payments' or 'overdue' still match
+_PRIORITY_RE = re.compile('|'.join(map(re.escape, HIGH_PRIORITY_KEYWORDS)), re.IGNORECASE)
+
+# With pyahocorasick installed, keywords are matched by an Aho-Corasick automaton
+# in one linear pass over lowercased text instead of the regex alternation
+if ahocorasick is not None:
+    _PRIORITY_AC = ahocorasick.Automaton()
+    for _keyword in HIGH_PRIORITY_KEYWORDS:
+        _PRIORITY_AC.add_word(_keyword, _keyword)
+    _PRIORITY_AC.make_automaton()
+else:
+    _PRIORITY_AC = None
+
+# Messages in these labels never become action files
+SKIPPED_LABELS = {'SPAM', 'TRASH'}
+
+# Headers requested when only message metadata is fetched
+METADATA_HEADERS = ['From', 'Subject', 'Date']
+
+# Gmail truncates snippets to roughly 200 characters; anything shorter than this
+# is treated as the complete body text so the full MIME payload is never fetched
+SNIPPET_COMPLETE_MAX_LENGTH = 100
+
+# Gmail accepts up to 100 calls per batch but recommends staying at or below 50
+DEFAULT_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 100
+
+# Number of threads creating action files in parallel
+DEFAULT_WORKERS = 8
+
+# Cycles an email may fail to fetch before it is skipped so the history ID can advance
+MAX_FETCH_ATTEMPTS = 5
+
+
+# Markdown action file with YAML frontmatter, filled in with str.format_map
+_ACTION_FILE_TEMPLATE = """---
+type: email
+from: {From}
+subject: {Subject}
+received: {received}
+priority: {priority}
+status: pending
+---
+
+## Email Content
+{body}
+
+## Suggested Actions
+- [ ] Review content and determine appropriate response
+- [ ] Take necessary action based on email content
+- [ ] Archive or mark as read after processing
+"""
+
+# Headers copied into the frontmatter, with defaults for when they are missing
+_FRONTMATTER_HEADERS = {'From': 'Unknown', 'Subject': 'No Subject'}
+
+_COLON_TRANS = str.maketrans({':': ';'})
+
+
+@lru_cache(maxsize=None)
+def _is_ascii_whitespace_compatible(charset: str) -> bool:
+    """Check whether a charset encodes ASCII whitespace as the same single bytes (false for UTF-16/32)"""
+    try:
+        return ' \t\n\r\x0b\x0c'.encode(charset) == b' \t\n\r\x0b\x0c'
+    except (LookupError, UnicodeError):
+        return False
+
+
+class _TemplateFields(dict):
+    """Template fields that fall back to the frontmatter header defaults"""
+
+    def __missing__(self, key):
+        return _FRONTMATTER_HEADERS.get(key, '')
+
+
+@dataclass(slots=True)
+class GmailItem:
+    """A new email to process; details hold the API message once fetched"""
+    id: str
+    details: dict | None = None
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that decodes API responses with orjson"""
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and 'data' in body:
+            body = body['data']
+        return body
+
+
 class GmailWatcher(BaseWatcher):
     def __init__(self, vault_path: str, credentials_path: str, check_interval: int = 10):
         super().__init__(vault_path, check_interval)
@@ -34,9 +171,16 @@ class GmailWatcher(BaseWatcher):
 
         # Load credentials and build service
         try:
-            credentials_path_obj = Path(credentials_path)
-            self.creds = Credentials.from_authorized_user_file(str(credentials_path_obj))
-            self.service = build('gmail', 'v1', credentials=self.creds)
+            self.credentials_path = Path(credentials_path)
+            self.creds = Credentials.from_authorized_user_file(str(self.credentials_path))
+            # Use the discovery document bundled with the client instead of downloading it,
+            # and skip the mutual-TLS client certificate lookup
+            os.environ.setdefault('GOOGLE_API_USE_CLIENT_CERTIFICATE', 'false')
+            self.service = build('gmail', 'v1', credentials=self.creds,
+                                 static_discovery=True, cache_discovery=False,
+                                 model=_OrjsonModel() if orjson else None)
+            # Remember the access token so refreshes can be written back to disk
+            self._saved_token = self.creds.token
         except FileNotFoundError:
             self.logger.error(f"Credentials file not found: {credentials_path}")
             raise
@@ -44,49 +188,166 @@ class GmailWatcher(BaseWatcher):
             self.logger.error("Credentials have expired or are invalid. Please re-authenticate.")
             raise
 
-        # Track processed email IDs to prevent duplicates
+        # Action files are written concurrently so disk I/O overlaps across emails
+        self._pool = ThreadPoolExecutor(max_workers=int(os.getenv('GMAIL_WORKERS', DEFAULT_WORKERS)))
+
+        # Track processed email IDs to prevent duplicates; the file is loaded on the
+        # pool so startup and the first mailbox listing don't wait for it
         self.processed_ids_file = Path(__file__).parent / '.gmail_processed_ids'
-        self.processed_ids = self._load_processed_ids()
+        self._processed_ids_future = self._pool.submit(self._load_processed_ids)
+        # New IDs are appended one per line; line buffering flushes each write
+        self._ids_fh = open(self.processed_ids_file, 'a', encoding='utf-8', buffering=1)
+        self._ids_lock = threading.Lock()
+
+        # Track the mailbox history ID so each check only fetches the delta
+        self.history_id_file = Path(__file__).parent / '.gmail_history_id'
+        self.history_id = self._load_history_id()
+        # New history ID from the latest check; saved only once its emails are written
+        self._pending_history_id = None
+        # Failed fetch attempts per email ID; the history ID is held back while any is retried
+        self._fetch_failures = {}
+
+        # Number of messages.get calls coalesced into a single batch request
+        batch_size = int(os.getenv('GMAIL_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
 
     def check_for_updates(self) -> list:
-        """Check for all new unread emails"""
+        """Check for new unread emails since the last recorded history ID"""
         try:
-            results = self.service.users().messages().list(
+            message_ids = None
+            self._pending_history_id = None
+            if self.history_id:
+                try:
+                    message_ids = self._list_history_message_ids()
+                except HttpError as e:
+                    # History records expire after about a week; resync from scratch
+                    if e.resp.status != 404:
+                        raise
+                    self.logger.warning("Stored history ID has expired, falling back to a full sync")
+
+            if message_ids is None:
+                message_ids = self._list_unread_message_ids()
+
+            self._save_refreshed_credentials()
+
+            # Message details are fetched in create_action_files, only for what gets processed
+            new_messages = [
+                GmailItem(m) for m in message_ids
+                if m not in self.processed_ids and self._fetch_failures.get(m, 0) < MAX_FETCH_ATTEMPTS
+            ]
+
+            self.logger.info(f"Found {len(new_messages)} new unread emails")
+            return new_messages
+
+        except Exception as e:
+            # Re-raise so the run loop can back off on repeated failures
+            self.logger.error(f"Error checking for email updates: {e}")
+            raise
+
+    def _list_history_message_ids(self) -> list:
+        """List IDs of unread messages added since the stored history ID"""
+        message_ids = {}  # dict keeps arrival order while dropping duplicates
+        page_token = None
+
+        while True:
+            results = self.service.users().history().list(
                 userId='me',
-                q='is:unread'
-                # No maxResults limit to fetch all unread emails
+                startHistoryId=self.history_id,
+                historyTypes=['messageAdded'],
+                labelId='UNREAD',
+                pageToken=page_token
             ).execute()
 
-            messages = results.get('messages', [])
-            new_messages = []
+            for record in results.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message = added['message']
+                    # history.list also reports mail delivered to spam or trash
+                    if SKIPPED_LABELS.intersection(message.get('labelIds', [])):
+                        continue
+                    message_ids[message['id']] = None
 
-            for message in messages:
-                if message['id'] not in self.processed_ids:
-                    # Get full message details to check if it's really new
-                    msg_details = self.service.users().messages().get(
-                        userId='me',
-                        id=message['id'],
-                        format='full'  # Use full format to get headers
-                    ).execute()
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
 
-                    # Add to new messages if it passes all checks
-                    new_messages.append({
-                        'id': message['id'],
-                        'details': msg_details
-                    })
+        self._pending_history_id = results.get('historyId')
+        return list(message_ids)
 
-            self.logger.info(f"Found {len(new_messages)} new unread emails")
-            return new_messages
+    def _list_unread_message_ids(self) -> list:
+        """List IDs of all unread messages and reseed the history ID"""
+        # Read the history ID before listing so nothing arriving mid-sync is missed
+        profile = self.service.users().getProfile(userId='me').execute()
 
-        except Exception as e:
-            self.logger.error(f"Error checking for email updates: {e}")
-            return []
+        message_ids = []
+        page_token = None
+
+        # Page through every result; later cycles only read deltas, so unread mail
+        # past the first page would otherwise never be seen
+        while True:
+            results = self.service.users().messages().list(
+                userId='me',
+                q='is:unread',
+                maxResults=500,
+                pageToken=page_token
+            ).execute()
+
+            message_ids.extend(m['id'] for m in results.get('messages', []))
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
 
-    def create_action_file(self, message_data) -> Path:
+        self._pending_history_id = profile.get('historyId')
+        return message_ids
+
+    def _get_message(self, message_id: str) -> dict:
+        """Fetch a single message with its full MIME payload"""
+        return self.service.users().messages().get(userId='me', id=message_id, format='full').execute()
+
+    def _needs_full_body(self, msg: dict) -> bool:
+        """Check whether the snippet may be truncated and the full body must be decoded"""
+        snippet = msg.get('snippet', '')
+        return not snippet or len(snippet) >= SNIPPET_COMPLETE_MAX_LENGTH
+
+    def _iter_message_batches(self, message_ids: list, format: str = 'full', failed: set | None = None):
+        """Yield message details one batch request at a time, as each batch completes
+
+        IDs whose fetch failed for any reason other than the message being deleted
+        are added to ``failed`` when it is given.
+        """
+        params = {'format': format}
+        if format == 'metadata':
+            params['metadataHeaders'] = METADATA_HEADERS
+
+        for start in range(0, len(message_ids), self.batch_size):
+            results = {}
+
+            def callback(request_id, response, exception):
+                if exception is not None:
+                    # Messages deleted since they were listed will never be fetchable
+                    if isinstance(exception, HttpError) and exception.resp.status == 404:
+                        self.logger.info(f"Message {request_id} no longer exists, skipping")
+                        return
+                    self.logger.error(f"Error fetching message {request_id}: {exception}")
+                    if failed is not None:
+                        failed.add(request_id)
+                    return
+                results[request_id] = response
+
+            batch = self.service.new_batch_http_request(callback=callback)
+            for message_id in message_ids[start:start + self.batch_size]:
+                batch.add(
+                    self.service.users().messages().get(userId='me', id=message_id, **params),
+                    request_id=message_id
+                )
+            batch.execute()
+            yield results
+
+    def create_action_file(self, message_data: GmailItem) -> Path:
         """Create markdown file in Inbox with YAML frontmatter"""
         try:
-            message_id = message_data['id']
-            msg = message_data['details']
+            message_id = message_data.id
+            msg = message_data.details or self._get_message(message_id)
 
             # Extract headers
             headers = {}
@@ -99,171 +360,231 @@ class GmailWatcher(BaseWatcher):
             # Determine priority based on full content
             priority = self._determine_priority(headers, full_body)
 
-            # Create markdown content with YAML frontmatter
-            content = f"""---
-type: email
-from: {headers.get('From', 'Unknown').replace(':', ';').strip()}
-subject: {headers.get('Subject', 'No Subject').replace(':', ';').strip()}
-received: {datetime.now().isoformat()}
-priority: {priority}
-status: pending
----
-
-## Email Content
-{full_body}
-
-## Suggested Actions
-- [ ] Review content and determine appropriate response
-- [ ] Take necessary action based on email content
-- [ ] Archive or mark as read after processing
-"""
+            # Fill the markdown template; header values have colons replaced so the YAML stays valid
+            fields = _TemplateFields(
+                {name: headers[name].translate(_COLON_TRANS).strip()
+                 for name in _FRONTMATTER_HEADERS if name in headers},
+                received=datetime.now().isoformat(),
+                priority=priority,
+                body=full_body
+            )
+            content = _ACTION_FILE_TEMPLATE.format_map(fields)
 
             # Create filename with email ID to ensure uniqueness
             filename = f"EMAIL_{message_id}.md"
             filepath = self.inbox / filename
 
-            # Write content to file
-            filepath.write_text(content, encoding='utf-8')
+            # Write content to file atomically so a crash or power loss never leaves a partial file
+            self._atomic_write(filepath, content.encode('utf-8'))
 
             # Add to processed IDs to prevent duplicate processing
-            self.processed_ids.add(message_id)
-            self._save_processed_ids()
+            with self._ids_lock:
+                self.processed_ids.add(message_id)
+                self._save_processed_id(message_id)
 
             self.logger.info(f"Created action file: {filepath}")
             return filepath
 
         except Exception as e:
-            self.logger.error(f"Error creating action file for message {message_data.get('id', 'unknown')}: {e}")
+            self.logger.error(f"Error creating action file for message {message_data.id}: {e}")
             raise
 
-    def _determine_priority(self, headers: dict, snippet: str) -> str:
-        """Determine email priority based on content"""
-        subject = headers.get('Subject', '').lower()
-        sender = headers.get('From', '').lower()
-        snippet_lower = snippet.lower()
+    def _atomic_write(self, path: Path, data: bytes):
+        """Write data to a temporary file in the same directory and rename it into place
 
-        # Check for high priority indicators
-        high_priority_keywords = [
-            'urgent', 'asap', 'important', 'deadline', 'invoice',
-            'payment', 'money', 'billing', 'due', 'critical'
-        ]
+        The data is fsynced before the rename, so the file is never empty or partial
+        after a power loss; a failed write removes the temporary file.
+        """
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
 
-        # Combine all text for keyword checking
-        all_text = f"{subject} {sender} {snippet_lower}"
+    def _run_cycle(self):
+        """Check for new emails and advance the history ID only once all of them are written"""
+        items = self.check_for_updates()
+        # Raises only if an action file could not be written, so the run loop backs off
+        self.create_action_files(items)
+
+        # Emails that failed to fetch are listed again at the normal interval from the
+        # unchanged history ID, until they run out of attempts
+        retrying = [m for m, attempts in self._fetch_failures.items() if attempts < MAX_FETCH_ATTEMPTS]
+        if retrying:
+            self.logger.warning(f"{len(retrying)} emails could not be fetched and will be retried: {retrying}")
+            return
+        self._commit_history_id()
+        self._fetch_failures.clear()
+
+    def create_action_files(self, items: list) -> list:
+        """Create action files in parallel, overlapping batched fetches with file writes"""
+        futures = []
+        pending = {}
+
+        def dispatch(item):
+            # Emails whose snippet is the whole body can be written straight away
+            if self._needs_full_body(item.details):
+                pending[item.id] = item
+            else:
+                futures.append(self._pool.submit(self.create_action_file, item))
+
+        for item in items:
+            if item.details:
+                dispatch(item)
+
+        # Fetch headers and snippets one batch at a time; the pool writes each
+        # batch's files while the next batch is in flight
+        missing_ids = [item.id for item in items if not item.details]
+        unfetched = set()
+        for batch_results in self._iter_message_batches(missing_ids, format='metadata', failed=unfetched):
+            for message_id, msg in batch_results.items():
+                dispatch(GmailItem(message_id, msg))
+
+        # Count failed fetches; fetched and deleted emails no longer need retrying
+        for message_id in missing_ids:
+            if message_id not in unfetched:
+                self._fetch_failures.pop(message_id, None)
+                continue
+            attempts = self._fetch_failures.get(message_id, 0) + 1
+            self._fetch_failures[message_id] = attempts
+            if attempts >= MAX_FETCH_ATTEMPTS:
+                self.logger.error(f"Giving up on email {message_id} after {attempts} failed fetches")
+
+        # Then fetch full payloads, again in batches, where the snippet falls short
+        for batch_results in self._iter_message_batches(list(pending), format='full'):
+            for message_id, msg in batch_results.items():
+                item = pending.pop(message_id)
+                item.details = msg
+                futures.append(self._pool.submit(self.create_action_file, item))
+
+        # Emails whose full fetch failed are written from their metadata and snippet
+        for item in pending.values():
+            futures.append(self._pool.submit(self.create_action_file, item))
+
+        return [future.result() for future in futures]
+
+    def _determine_priority(self, headers: dict, snippet: str) -> str:
+        """Determine email priority based on content"""
+        # Combine all text for keyword checking in a single pass
+        all_text = f"{headers.get('Subject', '')} {headers.get('From', '')} {snippet}"
 
-        for keyword in high_priority_keywords:
-            if keyword in all_text:
-                return 'high'
+        if _PRIORITY_AC is not None:
+            found = next(_PRIORITY_AC.iter(all_text.lower()), None) is not None
+        else:
+            found = _PRIORITY_RE.search(all_text) is not None
 
-        return 'normal'
+        return 'high' if found else 'normal'
 
     def _extract_full_email_body(self, msg):
         """Extract full email body from the message, ensuring only plain text is returned without HTML"""
         try:
-            # Check if the message has a payload
-            if 'payload' not in msg:
-                cleaned_content = self._ensure_plain_text(msg.get('snippet', 'No content available'))
-                # Return empty string if content is only HTML with no meaningful text
-                if self._is_html_only(cleaned_content):
-                    return ""
-                return cleaned_content
-
-            payload = msg['payload']
-
-            # Check if the payload has parts (multipart email)
-            if 'parts' in payload:
-                # Handle multipart emails
-                parts = payload['parts']
-
-                # First, try to find plain text parts (excluding images and attachments)
-                for part in parts:
-                    mime_type = part.get('mimeType', '')
-
-                    # Skip image parts and other attachment types
-                    if mime_type.startswith('image/'):
-                        continue
-
-                    # Process plain text parts
-                    if mime_type == 'text/plain':
-                        body_data = part.get('body', {}).get('data')
-                        if body_data:
-                            decoded_bytes = base64.urlsafe_b64decode(body_data)
-                            text_content = decoded_bytes.decode('utf-8')
-                            cleaned_content = self._ensure_plain_text(text_content)
-                            # Return empty string if content is only HTML with no meaningful text
-                            if self._is_html_only(cleaned_content):
-                                return ""
-                            return cleaned_content
-
-                # If no plain text found, try HTML parts (convert to plain text)
-                for part in parts:
-                    mime_type = part.get('mimeType', '')
-
-                    # Skip image parts and other attachment types
-                    if mime_type.startswith('image/'):
-                        continue
-
-                    if mime_type == 'text/html':
-                        body_data = part.get('body', {}).get('data')
-                        if body_data:
-                            decoded_bytes = base64.urlsafe_b64decode(body_data)
-                            html_content = decoded_bytes.decode('utf-8')
-
-                            # Ensure HTML is converted to plain text
-                            plain_text = self._html_to_plain_text(html_content)
-                            cleaned_content = self._ensure_plain_text(plain_text)
-                            # Return empty string if content is only HTML with no meaningful text
-                            if self._is_html_only(cleaned_content):
-                                return ""
-                            return cleaned_content
-
-            # If no parts, try to get the body directly from the payload
-            elif 'body' in payload and 'data' in payload['body']:
-                body_data = payload['body']['data']
-                decoded_bytes = base64.urlsafe_b64decode(body_data)
-                text_content = decoded_bytes.decode('utf-8')
-                cleaned_content = self._ensure_plain_text(text_content)
-                # Return empty string if content is only HTML with no meaningful text
-                if self._is_html_only(cleaned_content):
-                    return ""
-                return cleaned_content
-
-            # Fallback to snippet if no body found
-            cleaned_content = self._ensure_plain_text(msg.get('snippet', 'No content available'))
-            # Return empty string if content is only HTML with no meaningful text
-            if self._is_html_only(cleaned_content):
-                return ""
-            return cleaned_content
+            # Single pass over the MIME tree recording the first plain text and HTML parts
+            plain = html = None
+            for part in self._iter_parts(msg.get('payload', {})):
+                mime_type = part.get('mimeType', '')
+
+                # Skip image parts, other attachment types and parts without inline data
+                if mime_type.startswith('image/') or not part.get('body', {}).get('data'):
+                    continue
+
+                if mime_type == 'text/plain':
+                    plain = part
+                    break
+                if mime_type == 'text/html' and html is None:
+                    html = part
+
+            # Prefer plain text, then HTML converted to plain text, then the snippet
+            if plain is not None:
+                content = self._decode_part(plain)
+            elif html is not None:
+                content = self._html_to_plain_text(self._decode_part(html))
+            else:
+                # Metadata-only messages carry no body data, so use the snippet without decoding
+                content = msg.get('snippet', 'No content available')
 
         except Exception as e:
             self.logger.error(f"Error extracting email body: {e}")
             # Fallback to cleaned snippet if extraction fails
-            cleaned_content = self._ensure_plain_text(msg.get('snippet', 'Content extraction failed, no content available'))
-            # Return empty string if content is only HTML with no meaningful text
-            if self._is_html_only(cleaned_content):
-                return ""
-            return cleaned_content
+            content = msg.get('snippet', 'Content extraction failed, no content available')
+
+        cleaned_content = self._ensure_plain_text(content)
+        # Return empty string if content is only HTML with no meaningful text
+        if self._is_html_only(cleaned_content):
+            return ""
+        return cleaned_content
+
+    def _iter_parts(self, payload: dict):
+        """Yield the leaf MIME parts of a payload, recursing into nested multiparts"""
+        parts = payload.get('parts')
+        if not parts:
+            yield payload
+            return
+        for part in parts:
+            yield from self._iter_parts(part)
+
+    def _decode_part(self, part: dict) -> str:
+        """Decode the base64url body data of a MIME part in its declared charset, with whitespace collapsed"""
+        raw = base64.urlsafe_b64decode(part['body']['data'])
+        charset = self._part_charset(part)
+
+        # Byte-level whitespace collapse only where whitespace bytes mean the same as in ASCII
+        if _is_ascii_whitespace_compatible(charset):
+            raw = raw.translate(_WS_TABLE)
+            # Collapse runs of spaces on the raw bytes; each pass halves the longest run
+            while b'  ' in raw:
+                raw = raw.replace(b'  ', b' ')
+
+        # Strict decoding: an undecodable or unknown charset falls back to the snippet
+        return raw.decode(charset)
+
+    def _part_charset(self, part: dict) -> str:
+        """Return the charset from a MIME part's Content-Type header, defaulting to UTF-8"""
+        for header in part.get('headers', []):
+            if header.get('name', '').lower() == 'content-type':
+                match = _CHARSET_RE.search(header.get('value', ''))
+                if match:
+                    return match.group(1)
+        return 'utf-8'
 
     def _html_to_plain_text(self, html_content: str) -> str:
         """Convert HTML content to plain text using multiple methods to ensure no HTML remains"""
         if not html_content:
             return ""
 
+        # Prefer selectolax's single-pass C parser, which also decodes entities
+        if HTMLParser is not None:
+            try:
+                tree = HTMLParser(html_content)
+                tree.strip_tags(['script', 'style'])
+                text = tree.text(separator=' ', strip=True)
+                return _WS_RE.sub(' ', text).strip()
+            except Exception as e:
+                self.logger.warning(f"selectolax failed to parse HTML, using regex fallback: {e}")
+
         # First, unescape HTML entities
         text = unescape(html_content)
 
         # Use multiple regex patterns to remove various HTML elements
         # Remove script and style elements and their content
-        text = re.sub(r'<(script|style)[^>]*>.*?</\1>', ' ', text, flags=re.DOTALL | re.IGNORECASE)
+        text = _SCRIPT_STYLE_RE.sub(' ', text)
 
         # Remove HTML comments
-        text = re.sub(r'<!--.*?-->', ' ', text, flags=re.DOTALL)
+        text = _COMMENT_RE.sub(' ', text)
 
         # Remove HTML tags (more comprehensive pattern)
-        text = re.sub(r'<[^>]*>', ' ', text)
+        text = _TAG_RE.sub(' ', text)
 
         # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
         text = text.strip()
 
         return text
@@ -276,24 +597,8 @@ status: pending
         # Apply the same cleaning as before
         cleaned = self._clean_text(text)
 
-        # Additional check to ensure no HTML-like content remains
-        # Remove any remaining HTML-like patterns (e.g., &nbsp;, &amp;, etc.)
-        # But ensure we don't remove legitimate content
-
-        # Remove common HTML entities while preserving their meaning
-        entity_map = {
-            '&nbsp;': ' ',
-            '&amp;': '&',
-            '&lt;': '<',
-            '&gt;': '>',
-            '&quot;': '"',
-            '&#39;': "'",
-        }
-
-        for entity, replacement in entity_map.items():
-            cleaned = cleaned.replace(entity, replacement)
-
-        # Final cleanup to ensure it's plain text
+        # Final cleanup to ensure it's plain text; the second unescape also
+        # resolves double-encoded entities such as '&amp;nbsp;'
         return self._clean_text(cleaned)
 
     def _is_html_only(self, text: str) -> bool:
@@ -302,7 +607,7 @@ status: pending
             return True
 
         # Strip out common HTML remnants and check if there's meaningful content
-        stripped = re.sub(r'\s+', ' ', text).strip()
+        stripped = _WS_RE.sub(' ', text).strip()
 
         # If text is too short after cleaning, it might be just HTML artifacts
         if len(stripped) < 5:
@@ -314,7 +619,7 @@ status: pending
             return True
 
         # If it's just HTML tags and spaces, return True
-        if re.match(r'^[<>\s\/=\-"\'\[\]]*$', stripped):
+        if _HTML_REMNANTS_RE.match(stripped):
             return True
 
         return False
@@ -328,59 +633,106 @@ status: pending
         text = unescape(text)
 
         # Remove URLs/links from the text
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        text = re.sub(r'www\.(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+        text = _URL_RE.sub('', text)
 
         # Replace multiple whitespace characters (spaces, tabs, newlines) with single spaces
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
 
         # Remove leading/trailing whitespace
         text = text.strip()
 
         # Normalize line breaks to single newlines for readability
-        text = re.sub(r'[ \t]*\n[ \t]*', '\n', text)
+        text = _LINE_BREAK_RE.sub('\n', text)
 
         return text
 
+    @property
+    def processed_ids(self) -> set:
+        """IDs of emails already turned into action files; waits for the startup load"""
+        return self._processed_ids_future.result()
+
     def _load_processed_ids(self):
         """Load processed email IDs from file to prevent duplicate processing across runs"""
         if self.processed_ids_file.exists():
             try:
-                content = self.processed_ids_file.read_text(encoding='utf-8').strip()
-                if content:
-                    return set(content.splitlines())
-                else:
-                    return set()
+                # str.splitlines runs in C; IDs stay str to match the API's IDs (ADR-007)
+                content = self.processed_ids_file.read_text(encoding='utf-8')
+                lines = content.splitlines()
+                processed_ids = set(lines)
+                processed_ids.discard('')
+
+                # Rewrite the file if it is mostly duplicates or predates the
+                # newline-terminated format, so appends start on a fresh line
+                if content and (not content.endswith('\n') or len(lines) > 2 * len(processed_ids)):
+                    self._compact_processed_ids(processed_ids)
+                return processed_ids
             except Exception as e:
                 self.logger.error(f"Error loading processed IDs: {e}")
                 return set()
         return set()
 
-    def _save_processed_ids(self):
-        """Save processed email IDs to file"""
+    def _save_processed_id(self, message_id: str):
+        """Append a processed email ID to file"""
         try:
-            self.processed_ids_file.write_text('\n'.join(sorted(self.processed_ids)), encoding='utf-8')
+            self._ids_fh.write(f"{message_id}\n")
         except Exception as e:
             self.logger.error(f"Error saving processed IDs: {e}")
 
-    def run(self):
-        """Override run method with better error handling"""
-        self.logger.info(f'Starting {self.__class__.__name__}')
-        while True:
+    def _compact_processed_ids(self, processed_ids: set):
+        """Rewrite the processed IDs file with one sorted, unique ID per line"""
+        try:
+            self.processed_ids_file.write_text(''.join(f"{i}\n" for i in sorted(processed_ids)), encoding='utf-8')
+        except Exception as e:
+            self.logger.error(f"Error compacting processed IDs: {e}")
+
+    def _save_refreshed_credentials(self):
+        """Write credentials back to the token file after the client refreshes them"""
+        if self.creds.token == self._saved_token:
+            return
+        try:
+            self.credentials_path.write_text(self.creds.to_json(), encoding='utf-8')
+            self._saved_token = self.creds.token
+        except Exception as e:
+            self.logger.error(f"Error saving refreshed credentials: {e}")
+
+    def _commit_history_id(self):
+        """Advance the history ID to the one found by the latest check and save it"""
+        if self._pending_history_id:
+            self.history_id = self._pending_history_id
+            self._pending_history_id = None
+            self._save_history_id()
+
+    def _load_history_id(self):
+        """Load the last seen mailbox history ID from file"""
+        if self.history_id_file.exists():
             try:
-                items = self.check_for_updates()
-                for item in items:
-                    self.create_action_file(item)
-            except KeyboardInterrupt:
-                self.logger.info("Gmail Watcher stopped by user")
-                break
+                return self.history_id_file.read_text(encoding='utf-8').strip() or None
             except Exception as e:
-                self.logger.error(f'Unexpected error in {self.__class__.__name__}: {e}')
-                # Wait before retrying to avoid rapid error loops
-                time.sleep(self.check_interval)
+                self.logger.error(f"Error loading history ID: {e}")
+        return None
+
+    def _save_history_id(self):
+        """Save the last seen mailbox history ID to file"""
+        if not self.history_id:
+            return
+        try:
+            self.history_id_file.write_text(str(self.history_id), encoding='utf-8')
+        except Exception as e:
+            self.logger.error(f"Error saving history ID: {e}")
 
-            # Sleep for the check interval before next check
-            time.sleep(self.check_interval)
+    def run(self):
+        """Override run method to stop cleanly on Ctrl+C and release the worker pool"""
+        try:
+            super().run()
+        except KeyboardInterrupt:
+            self.logger.info("Gmail Watcher stopped by user")
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        """Wait for in-flight action files, stop the worker pool and close the processed IDs file"""
+        self._pool.shutdown(wait=True)
+        self._ids_fh.close()
 
 
 if __name__ == "__main__":